@@ -1,6 +1,14 @@
+import functools
+import json
+import os
+
+import numpy as np
 import pandas as pd
 from dash import Dash, dcc, html, Input, Output
-import plotly.express as px
+import plotly.graph_objects as go
+import plotly.io as pio
+
+DATA_PATH = "fragrance_sampling/fragrance_sampling_data.csv"
 
 # dracula:
 color_scheme = {
@@ -11,6 +19,19 @@ color_scheme = {
     "hl": "#8BE9FD",
 }
 
+pio.templates["dracula"] = go.layout.Template(
+    data=dict(bar=[go.Bar(marker_color=color_scheme["hl"])]),
+    layout=dict(
+        font_color=color_scheme["fg"],
+        title_font_color=color_scheme["fg"],
+        legend_title_font_color=color_scheme["fg"],
+        paper_bgcolor="rgba(0, 0, 0, 0)",
+        plot_bgcolor="rgba(0, 0, 0, 0)",
+        xaxis=dict(gridcolor=color_scheme["fg"], zeroline=False),
+        yaxis=dict(gridcolor=color_scheme["fg"], zeroline=False),
+    ),
+)
+
 
 app = Dash(__name__)
 app.layout = html.Div(
@@ -31,7 +52,6 @@ app.layout = html.Div(
         dcc.Graph(id="house_rating_plot"),
         dcc.Graph(id="fragrances_house_plot"),
         dcc.Graph(id="hist_plot"),
-        dcc.Store(id="df"),
     ],
     style={
         "padding": "50px 50px 50px 100px",
@@ -41,135 +61,186 @@ app.layout = html.Div(
 )
 
 
-@app.callback(Output("df", "data"), Input("load_interval", "n_intervals"))
-def load_data(n_intervals):
+def _load_df():
     df = pd.read_csv(
-        "fragrance_sampling/fragrance_sampling_data.csv",
+        DATA_PATH,
         sep=";",
         encoding="UTF-8",
         decimal=",",
+        dtype={"house": "category", "fragrance": "category"},
     )
 
     for date_col in ["order_date", "arrival_date", "shipping_date"]:
         df[date_col] = pd.to_datetime(df[date_col], format="%Y-%m-%d")
 
-    df["sample_cost_ml"] = df["sample_cost"] / df["sample_ml"]
-    df["bottle_cost_ml"] = df["bottle_cost"] / df["bottle_ml"]
+    # plain array division, the columns share an index so alignment is not needed
+    with np.errstate(divide="ignore", invalid="ignore"):
+        df["sample_cost_ml"] = np.divide(
+            df["sample_cost"].to_numpy(), df["sample_ml"].to_numpy()
+        )
+        df["bottle_cost_ml"] = np.divide(
+            df["bottle_cost"].to_numpy(), df["bottle_ml"].to_numpy()
+        )
 
-    return df.to_json(date_format="iso", orient="split")
+    return df
+
+
+def _order_rollup(df):
+    """Sum cost and amount and average rating per order date.
+
+    Equivalent to a groupby on order_date, done with one factorize and
+    np.bincount per column. NaN values are skipped like pandas does, and
+    sums keep the source dtype when the column has no NaN.
+    """
+    codes, order_dates = pd.factorize(df["order_date"], sort=True)
+    n = len(order_dates)
+    has_date = codes >= 0
+
+    def group_sum(col):
+        values = df[col].to_numpy(dtype=float)
+        is_nan = np.isnan(values)
+        mask = has_date & ~is_nan
+        sums = np.bincount(codes[mask], weights=values[mask], minlength=n)
+        return sums if is_nan.any() else sums.astype(df[col].dtype)
+
+    rating_count = np.bincount(
+        codes[has_date & df["rating"].notna().to_numpy()], minlength=n
+    )
+    with np.errstate(divide="ignore", invalid="ignore"):
+        rating_mean = group_sum("rating") / rating_count
+
+    return pd.DataFrame(
+        {
+            "order_date": order_dates,
+            "sample_cost": group_sum("sample_cost"),
+            "amount": group_sum("amount"),
+            "rating": rating_mean,
+        }
+    )
 
 
-@app.callback(
-    Output("kpis", "children"),
-    Input("df", "data"),
-)
 def calculate_kpis(df):
 
-    df = pd.read_json(df, orient="split")
+    totals = df.agg(
+        {
+            "sample_ml": "sum",
+            "bottle_ml": "sum",
+            "sample_cost": "sum",
+            "bottle_cost": "sum",
+            "sample_cost_ml": "mean",
+            "bottle_cost_ml": "mean",
+        }
+    )
 
     kpis = {
-        "Unique Fragrances": df[["house", "fragrance"]].drop_duplicates().shape[0],
-        "Unique Houses": df["house"].drop_duplicates().shape[0],
-        "Total ML (Samples)": df["sample_ml"].sum(),
-        "Total ML (Bottles)": df["bottle_ml"].sum(),
-        "Total Cost (Sampling)": df["sample_cost"].sum(),
-        "Total Cost (Bottles)": df["bottle_cost"].sum(),
-        "Average Cost / ML (Sampling)": df["sample_cost_ml"].mean(),
-        "Average Cost / ML (Bottles)": df["bottle_cost_ml"].mean(),
+        "Unique Fragrances": df.groupby(
+            ["house", "fragrance"], sort=False, observed=True
+        ).ngroups,
+        "Unique Houses": df["house"].nunique(),
+        "Total ML (Samples)": totals["sample_ml"],
+        "Total ML (Bottles)": totals["bottle_ml"],
+        "Total Cost (Sampling)": totals["sample_cost"],
+        "Total Cost (Bottles)": totals["bottle_cost"],
+        "Average Cost / ML (Sampling)": totals["sample_cost_ml"],
+        "Average Cost / ML (Bottles)": totals["bottle_cost_ml"],
     }
 
-    div_list = []
-    for k, v in kpis.items():
-        div_list.append(html.Div([f"{k}: {v:.2f}"]))
+    return html.Div([html.Div(f"{k}: {v:.2f}") for k, v in kpis.items()])
 
-    return html.Div(div_list)
 
+def _plot_values(values):
+    """Return a Series as an array plotly can encode without per-item lookups.
 
-def style_chart(fig, style):
-    if style == "vbar":
-        fig.update_xaxes(showgrid=False, gridcolor=color_scheme["fg"], zeroline=False)
-        fig.update_yaxes(showgrid=True, gridcolor=color_scheme["fg"], zeroline=False)
+    Dates are formatted to ISO strings in one vectorized call.
+    """
+    if pd.api.types.is_datetime64_any_dtype(values):
+        values = values.dt.strftime("%Y-%m-%d")
 
-    elif style == "bar":
-        fig.update_xaxes(showgrid=True, gridcolor=color_scheme["fg"], zeroline=False)
-        fig.update_yaxes(showgrid=False, gridcolor=color_scheme["fg"], zeroline=False)
+    return values.to_numpy()
 
-    fig.update_layout(
-        font_color=color_scheme["fg"],
-        title_font_color=color_scheme["fg"],
-        legend_title_font_color=color_scheme["fg"],
-        paper_bgcolor="rgba(0, 0, 0, 0)",
-        plot_bgcolor="rgba(0, 0, 0, 0)",
-    )
 
-    fig.update_traces(marker_color=color_scheme["hl"])
+def bar_chart(x, y, title, style, **layout):
+    """Build a bar chart from two Series, dracula colors over the plotly template.
 
-    return fig
+    style "vbar" draws vertical bars, "bar" horizontal ones. Extra keyword
+    arguments are passed on to the layout.
+    """
+    return go.Figure(
+        go.Bar(
+            x=_plot_values(x),
+            y=_plot_values(y),
+            orientation="h" if style == "bar" else "v",
+            hovertemplate=f"{x.name}=%{{x}}<br>{y.name}=%{{y}}<extra></extra>",
+        ),
+        layout=go.Layout(
+            template="plotly+dracula",
+            title=title,
+            xaxis=dict(title=x.name, showgrid=style == "bar"),
+            yaxis=dict(title=y.name, showgrid=style == "vbar"),
+            **layout,
+        ),
+    )
 
 
-@app.callback(
-    Output("order_cost_plot", "figure"),
-    Output("order_amount_plot", "figure"),
-    Output("order_rating_plot", "figure"),
-    Output("house_rating_plot", "figure"),
-    Output("fragrances_house_plot", "figure"),
-    Output("hist_plot", "figure"),
-    Input("df", "data"),
-)
 def plot(df):
-    df = pd.read_json(df, orient="split")
-
-    order_cost_data = df.groupby(["order_date"], as_index=False).sum("sample_cost")
-    order_cost_plot = px.bar(
-        order_cost_data, x="order_date", y="sample_cost", title="Cost per Order"
+    order_data = _order_rollup(df)
+    house_data = df.groupby("house", as_index=False, observed=True).agg(
+        rating=("rating", "mean")
     )
-    order_cost_plot = style_chart(order_cost_plot, "vbar")
-    order_cost_plot.update_layout(yaxis_ticksuffix="€", yaxis_tickformat=",.")
 
-    order_amount_data = df.groupby(["order_date"], as_index=False).sum("amount")
-    order_amount_plot = px.bar(
-        order_amount_data, x="order_date", y="amount", title="Fragrances per Order"
+    order_cost_plot = bar_chart(
+        order_data["order_date"],
+        order_data["sample_cost"],
+        "Cost per Order",
+        "vbar",
+        yaxis_ticksuffix="€",
+        yaxis_tickformat=",.",
     )
-    order_amount_plot = style_chart(order_amount_plot, "vbar")
-
-    order_rating_data = df.groupby(["order_date"], as_index=False).mean("rating")
-    order_rating_plot = px.bar(
-        order_rating_data,
-        x="order_date",
-        y="rating",
-        title="Rating per Order",
-        range_y=[0, 5.5],
+
+    order_amount_plot = bar_chart(
+        order_data["order_date"], order_data["amount"], "Fragrances per Order", "vbar"
     )
-    order_rating_plot = style_chart(order_rating_plot, "vbar")
 
-    house_rating_data = (
-        df.groupby(["house"], as_index=False).mean("rating").sort_values("rating")
+    order_rating_plot = bar_chart(
+        order_data["order_date"],
+        order_data["rating"],
+        "Rating per Order",
+        "vbar",
+        yaxis_range=[0, 5.5],
     )
-    house_rating_plot = px.bar(
-        house_rating_data,
-        x="rating",
-        y="house",
-        range_x=[0, 5.5],
-        orientation="h",
-        title="Average Rating per House",
+
+    house_rating_data = house_data.sort_values(["rating", "house"])
+    house_rating_plot = bar_chart(
+        house_rating_data["rating"],
+        house_rating_data["house"],
+        "Average Rating per House",
+        "bar",
+        xaxis_range=[0, 5.5],
     )
-    house_rating_plot = style_chart(house_rating_plot, "bar")
 
     fragrances_house_data = (
-        df.groupby(["house"], as_index=False).size().sort_values("size")
+        df["house"]
+        .value_counts(ascending=True)
+        .rename_axis("house")
+        .reset_index(name="size")
     )
-    fragrances_house_plot = px.bar(
-        fragrances_house_data,
-        x="size",
-        y="house",
-        title="Fragrances per House",
-        orientation="h",
+    fragrances_house_plot = bar_chart(
+        fragrances_house_data["size"],
+        fragrances_house_data["house"],
+        "Fragrances per House",
+        "bar",
     )
-    fragrances_house_plot = style_chart(fragrances_house_plot, "bar")
 
-    hist_data = df.groupby(["rating"], as_index=False).size()
-    hist_plot = px.bar(hist_data, x="rating", y="size", title="Rating Distribution")
-    hist_plot = style_chart(hist_plot, "vbar")
+    hist_data = (
+        df["rating"]
+        .value_counts(sort=False)
+        .sort_index()
+        .rename_axis("rating")
+        .reset_index(name="size")
+    )
+    hist_plot = bar_chart(
+        hist_data["rating"], hist_data["size"], "Rating Distribution", "vbar"
+    )
 
     return (
         order_cost_plot,
@@ -181,5 +252,34 @@ def plot(df):
     )
 
 
+@functools.lru_cache(maxsize=1)
+def _build_output(mtime):
+    """Build the KPI div and figure dicts returned by render.
+
+    The dashboard only changes with the CSV, so the output is cached per
+    file modification time and shared by all page loads. Figures are
+    serialized with plotly's own encoder once and stored as plain JSON
+    types, so Dash never has to convert numpy arrays or timestamps.
+    """
+    df = _load_df()
+
+    return (calculate_kpis(df), *(json.loads(fig.to_json()) for fig in plot(df)))
+
+
+@app.callback(
+    Output("kpis", "children"),
+    Output("order_cost_plot", "figure"),
+    Output("order_amount_plot", "figure"),
+    Output("order_rating_plot", "figure"),
+    Output("house_rating_plot", "figure"),
+    Output("fragrances_house_plot", "figure"),
+    Output("hist_plot", "figure"),
+    Input("load_interval", "n_intervals"),
+)
+def render(n_intervals):
+    return _build_output(os.stat(DATA_PATH).st_mtime)
+
+
 if __name__ == "__main__":
+    _build_output(os.stat(DATA_PATH).st_mtime)
     app.run_server(debug=True)
@@ -1,5 +1,30 @@
+import numpy as np
+import pandas as pd
+
 from fragrance_sampling import __version__
+from fragrance_sampling.fragrance_sampling import _order_rollup
 
 
 def test_version():
     assert __version__ == '0.1.0'
+
+
+def test_order_rollup_matches_groupby():
+    df = pd.DataFrame(
+        {
+            "order_date": pd.to_datetime(
+                ["2019-02-11", "2018-08-21", "2019-02-11", "2018-08-21", None]
+            ),
+            "sample_cost": [4.0, 5.0, np.nan, 6.0, 1.0],
+            "amount": [1, 1, 2, 1, 1],
+            "rating": [4.0, np.nan, 2.0, 3.0, 5.0],
+        }
+    )
+
+    expected = df.groupby("order_date", as_index=False).agg(
+        sample_cost=("sample_cost", "sum"),
+        amount=("amount", "sum"),
+        rating=("rating", "mean"),
+    )
+
+    pd.testing.assert_frame_equal(_order_rollup(df), expected)